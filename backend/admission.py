@@ -0,0 +1,156 @@
+"""
+Admission control and load shedding.
+
+Each guarded route gets a concurrency limit and a short wait queue.
+When both are full the request is rejected at once with 503 and
+Retry-After instead of piling up behind slow upstream calls.
+
+Every admitted request carries a deadline (REQUEST_DEADLINE seconds from
+arrival, or sooner if the client sends X-Request-Deadline-Ms). Upstream
+calls size their timeouts from it and routes call check_deadline()
+between stages so work that can no longer finish is dropped early.
+
+Limits are per worker process, so they only take effect with threaded
+workers; gunicorn.conf.py runs gthread workers with enough threads for
+the /predict limit and its queue. With sync workers (one request per
+process) the limiter never engages.
+"""
+import functools
+import os
+import threading
+import time
+
+from flask import jsonify, request
+
+REQUEST_DEADLINE = float(os.getenv("REQUEST_DEADLINE", 20))
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", 2))
+ADMISSION_RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER", 2))
+
+_local = threading.local()
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+class RouteLimiter:
+    def __init__(self, name, max_concurrency, max_queue):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, timeout):
+        """Take a slot, waiting in the queue for at most `timeout` seconds"""
+        with self._cond:
+            if self.active < self.max_concurrency:
+                self.active += 1
+                return True
+            if self.waiting >= self.max_queue or timeout <= 0:
+                self.rejected += 1
+                return False
+
+            self.waiting += 1
+            try:
+                admitted = self._cond.wait_for(lambda: self.active < self.max_concurrency, timeout)
+            finally:
+                self.waiting -= 1
+            if not admitted:
+                self.rejected += 1
+                return False
+            self.active += 1
+            return True
+
+    def release(self):
+        with self._cond:
+            self.active -= 1
+            self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "active": self.active,
+                "waiting": self.waiting,
+                "rejected": self.rejected,
+                "max_concurrency": self.max_concurrency,
+                "max_queue": self.max_queue
+            }
+
+
+def deadline_remaining():
+    """Seconds left for the current request (None outside a guarded route)"""
+    deadline = getattr(_local, "deadline", None)
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def check_deadline():
+    remaining = deadline_remaining()
+    if remaining is not None and remaining <= 0:
+        raise DeadlineExceeded()
+
+
+def deadline_expired():
+    """True once the current request's deadline has passed: skip further upstream calls"""
+    remaining = deadline_remaining()
+    return remaining is not None and remaining <= 0
+
+
+def upstream_timeout(default=10):
+    """HTTP timeout for an upstream call, capped by the request deadline"""
+    remaining = deadline_remaining()
+    if remaining is None:
+        return default
+    return max(0.05, min(default, remaining))
+
+
+def overloaded_response(message="Server busy, please retry"):
+    response = jsonify({"error": message})
+    response.status_code = 503
+    response.headers["Retry-After"] = str(ADMISSION_RETRY_AFTER)
+    return response
+
+
+def _request_deadline(arrived):
+    budget = REQUEST_DEADLINE
+    client_ms = request.headers.get("X-Request-Deadline-Ms")
+    if client_ms:
+        try:
+            budget = min(budget, max(0.0, float(client_ms) / 1000))
+        except ValueError:
+            pass
+    return arrived + budget
+
+
+def admission_control(limiter):
+    """Route decorator: bounded concurrency + queue, deadline for the request"""
+
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method == "OPTIONS":
+                return view(*args, **kwargs)
+
+            arrived = time.monotonic()
+            deadline = _request_deadline(arrived)
+            wait = min(ADMISSION_QUEUE_TIMEOUT, deadline - arrived)
+            if not limiter.acquire(wait):
+                print(f"[ADMISSION] Shedding {request.path} ({limiter.name} full)")
+                return overloaded_response()
+
+            _local.deadline = deadline
+            try:
+                if time.monotonic() >= deadline:
+                    return overloaded_response("Request deadline exceeded")
+                return view(*args, **kwargs)
+            finally:
+                _local.deadline = None
+                limiter.release()
+
+        return wrapper
+
+    return decorator
@@ -1,20 +1,32 @@
 import os
 from dotenv import load_dotenv
-from flask import Flask, request, jsonify
+
+# Load environment variables from the script's directory.
+# Must run before the local imports below: those modules read their settings at import time.
+base_dir = os.path.dirname(os.path.abspath(__file__))
+dotenv_path = os.path.join(base_dir, ".env")
+load_dotenv(dotenv_path)
+
+from flask import Flask, request, jsonify, Response, stream_with_context, send_from_directory
 from flask_cors import CORS
 import pandas as pd
 import joblib
 import traceback
-from location_fetch import resolve_location, reverse_geocode
+import hmac
+import math
+from location_fetch import resolve_location, reverse_geocode, reverse_geocode_many
+from gazetteer import get_gazetteer
 from weather_fetch import get_current_weather, get_weather_trends
+from model_train import FEATURES
+from prediction_cache import PredictionCache, make_key, model_version, shared_key
+from quota import init_quota_store, remember, recall
+from profiling import init_profiling, list_profiles, PROFILE_DIR
+from prefetch import start_prefetcher
+from admission import RouteLimiter, admission_control, check_deadline, overloaded_response, DeadlineExceeded
 from database import init_db, save_prediction, get_recent_predictions, create_user, get_user_by_email
+from export import export_predictions, EXPORT_FORMATS
 from werkzeug.security import generate_password_hash, check_password_hash
 
-# Load environment variables from the script's directory
-base_dir = os.path.dirname(os.path.abspath(__file__))
-dotenv_path = os.path.join(base_dir, ".env")
-load_dotenv(dotenv_path)
-
 # -------------------------------------------------------
 # App Init
 # -------------------------------------------------------
@@ -25,6 +37,21 @@ allowed_origins = os.getenv("ALLOWED_ORIGINS", "*").split(",")
 CORS(app, resources={r"/*": {"origins": allowed_origins}})
 
 init_db()
+init_quota_store()
+
+# Build the gazetteer indexes now, not inside the first request on each worker
+get_gazetteer()
+
+ADMIN_API_TOKEN = os.getenv("ADMIN_API_TOKEN")
+
+
+def is_admin_request():
+    """Admin-only endpoints are disabled unless ADMIN_API_TOKEN is configured"""
+    token = request.headers.get("X-Admin-Token")
+    return bool(ADMIN_API_TOKEN) and token is not None and hmac.compare_digest(token, ADMIN_API_TOKEN)
+
+
+init_profiling(app, is_admin_request)
 
 # -------------------------------------------------------
 # Load Model
@@ -46,6 +73,197 @@ except Exception as e:
     print(f"[ERROR] Model load failed ({e})")
     model, le = None, None
 
+# -------------------------------------------------------
+# Prediction Cache
+# -------------------------------------------------------
+MODEL_VERSION = model_version(model_path, encoder_path)
+prediction_cache = PredictionCache()
+
+
+class PredictionError(Exception):
+    pass
+
+
+def run_prediction(weather):
+    """
+    Model inference + risk rules for one weather snapshot.
+    Returns (label, risk_score)
+    """
+    # Prepare ML Input with correct column names
+    X = pd.DataFrame([{f: weather[f] for f in FEATURES}], columns=FEATURES)
+
+    print("[INFO] ML Input X:", X)
+
+    # Prediction
+    try:
+        pred = model.predict(X)
+        label = le.inverse_transform(pred)[0] if le else str(pred[0])
+    except Exception as e:
+        print("[ERROR] Prediction error:", e)
+        raise PredictionError(str(e))
+
+    # ---------------- RISK CALCULATION ---------------- 
+    try:
+        # Get model prediction probabilities
+        proba = model.predict_proba(X)[0]
+        max_confidence = max(proba)
+
+        # Base risk based on predicted disaster type
+        # If "Low Risk" is predicted, start with low base risk
+        # If a disaster is predicted, start with high base risk
+        if label == "Low Risk":
+            base_risk = 20  # Low base risk for safe conditions
+        elif "Flood" in label or "Cyclone" in label or "Drought" in label:
+            base_risk = 65  # High base risk for disaster predictions
+        else:
+            base_risk = 40  # Medium risk for unknown predictions
+
+        print(f"[INFO] Predicted label: {label}")
+        print(f"[INFO] Base risk from prediction: {base_risk}")
+        print(f"[INFO] Model confidence: {max_confidence * 100:.2f}%")
+
+        # Weather-based risk adjustments (more granular)
+        weather_risk = 0
+
+        # Rainfall risk (flood indicator)
+        if weather["rainfall"] > 70:
+            weather_risk += 20
+        elif weather["rainfall"] > 50:
+            weather_risk += 12
+        elif weather["rainfall"] > 30:
+            weather_risk += 6
+        elif weather["rainfall"] > 10:
+            weather_risk += 2
+
+        # Wind speed risk (cyclone indicator)
+        if weather["wind_speed"] > 30:
+            weather_risk += 20
+        elif weather["wind_speed"] > 25:
+            weather_risk += 15
+        elif weather["wind_speed"] > 15:
+            weather_risk += 8
+        elif weather["wind_speed"] > 8:
+            weather_risk += 3
+
+        # Temperature risk (drought/extreme heat indicator)
+        if weather["temperature"] > 40:
+            weather_risk += 15
+        elif weather["temperature"] > 38:
+            weather_risk += 10
+        elif weather["temperature"] < -5:
+            weather_risk += 12
+        elif weather["temperature"] < 0:
+            weather_risk += 8
+
+        # Pressure risk (storm indicator)
+        if weather["pressure"] < 970:
+            weather_risk += 15
+        elif weather["pressure"] < 980:
+            weather_risk += 10
+        elif weather["pressure"] < 1000:
+            weather_risk += 5
+
+        # Humidity risk (flood/storm indicator)
+        if weather["humidity"] > 90:
+            weather_risk += 8
+        elif weather["humidity"] > 85:
+            weather_risk += 5
+        elif weather["humidity"] < 30 and weather["temperature"] > 35:
+            weather_risk += 5  # Drought conditions
+
+        # Apply model confidence as a multiplier (0.8 to 1.2 range)
+        # Higher confidence increases risk, lower confidence decreases it
+        confidence_multiplier = 0.8 + (max_confidence * 0.4)
+
+        # Calculate final risk score
+        total_risk = (base_risk + weather_risk) * confidence_multiplier
+        risk = min(round(total_risk, 2), 100)
+
+        print(f"[INFO] Weather risk adjustment: {weather_risk}")
+        print(f"[INFO] Confidence multiplier: {confidence_multiplier:.2f}")
+        print(f"[INFO] Final risk score: {risk}")
+
+    except Exception as e:
+        print("[ERROR] Risk calculation failed:", e)
+        traceback.print_exc()
+        risk = 50
+        print(f"[INFO] Using default risk score: {risk}")
+
+
+    # Ensure risk_score is a valid number
+    risk_score = float(risk) if risk is not None else 50.0
+    risk_score = max(0, min(100, risk_score))  # Clamp between 0 and 100
+
+    return label, risk_score
+
+
+def cached_prediction(location, weather):
+    """
+    run_prediction memoized per location + weather snapshot + model version.
+    Misses in this worker's PredictionCache check the shared quota store
+    before running the model, so a result computed by any worker (or warmed
+    by the prefetcher) is reused by all of them.
+    """
+    cache_key = make_key(location, weather, MODEL_VERSION)
+    store_key = shared_key(cache_key)
+
+    def compute():
+        shared = recall(store_key)
+        if shared:
+            return tuple(shared)
+        result = run_prediction(weather)
+        remember(store_key, list(result))
+        return result
+
+    return prediction_cache.get_or_compute(cache_key, compute)
+
+
+def warm_prediction(location, weather):
+    """Precompute the prediction for a prefetched weather snapshot"""
+    if model is None:
+        return
+    try:
+        cached_prediction(location, weather)
+    except PredictionError:
+        pass
+
+
+start_prefetcher(warm_prediction)
+
+
+# -------------------------------------------------------
+# Admission Control
+# -------------------------------------------------------
+predict_limiter = RouteLimiter(
+    "predict",
+    int(os.getenv("PREDICT_MAX_CONCURRENCY", 8)),
+    int(os.getenv("PREDICT_MAX_QUEUE", 16))
+)
+weather_trends_limiter = RouteLimiter(
+    "weather-trends",
+    int(os.getenv("WEATHER_TRENDS_MAX_CONCURRENCY", 4)),
+    int(os.getenv("WEATHER_TRENDS_MAX_QUEUE", 8))
+)
+reverse_limiter = RouteLimiter(
+    "locations-reverse",
+    int(os.getenv("REVERSE_MAX_CONCURRENCY", 4)),
+    int(os.getenv("REVERSE_MAX_QUEUE", 8))
+)
+
+# LocationIQ lookups allowed per batch for points with no nearby gazetteer place
+REVERSE_BATCH_REMOTE_MAX = int(os.getenv("REVERSE_BATCH_REMOTE_MAX", 0))
+
+
+def parse_coordinates(lat, lon):
+    """(lat, lon) as floats, or None unless both are finite and in range"""
+    try:
+        lat, lon = float(lat), float(lon)
+    except (TypeError, ValueError):
+        return None
+    if not (math.isfinite(lat) and math.isfinite(lon) and -90 <= lat <= 90 and -180 <= lon <= 180):
+        return None
+    return lat, lon
+
 # -------------------------------------------------------
 # Routes
 # -------------------------------------------------------
@@ -114,11 +332,14 @@ def login():
 # Prediction Routes
 # -------------------------------------------------------
 @app.route("/predict", methods=["POST"])
+@admission_control(predict_limiter)
 def predict():
     try:
-        data = request.get_json()
+        data = request.get_json(silent=True)
         if not data:
             return jsonify({"error": "No input provided"}), 400
+        if not isinstance(data, dict):
+            return jsonify({"error": "JSON object required"}), 400
 
         user_input = data.get("city")
         lat = data.get("lat")
@@ -129,134 +350,35 @@ def predict():
 
         # Resolve Location
         if lat and lon:
+            coords = parse_coordinates(lat, lon)
+            if coords is None:
+                return jsonify({"error": "lat/lon must be finite, lat in [-90, 90], lon in [-180, 180]"}), 400
+            lat, lon = coords
             print(f"[INFO] Using coordinates: {lat}, {lon}")
             location = reverse_geocode(lat, lon)
         else:
             print(f"[INFO] Using city name: {user_input}")
             location = resolve_location(user_input)
 
+        check_deadline()
         if not location or not location.get("city"):
             return jsonify({"error": "Location not found"}), 400
 
         # Fetch Current Weather
         weather = get_current_weather(location["lat"], location["lon"])
+        check_deadline()
         if not weather:
             return jsonify({"error": "Weather fetch failed"}), 400
 
-        # Prepare ML Input with correct column names
-        X = pd.DataFrame([{
-            "temperature": weather["temperature"],
-            "humidity": weather["humidity"],
-            "rainfall": weather["rainfall"],
-            "wind_speed": weather["wind_speed"],
-            "pressure": weather["pressure"]
-        }])
-
-        print("[INFO] ML Input X:", X)
-
-        # Prediction
+        # Prediction (memoized per location + weather snapshot + model version)
         if model is None:
             return jsonify({"error": "Model not loaded"}), 500
 
         try:
-            pred = model.predict(X)
-            label = le.inverse_transform(pred)[0] if le else str(pred[0])
-        except Exception as e:
-            print("[ERROR] Prediction error:", e)
+            label, risk_score = cached_prediction(location, weather)
+        except PredictionError as e:
             return jsonify({"error": "Prediction failed", "details": str(e)}), 500
 
-        # ---------------- RISK CALCULATION ---------------- 
-        try:
-            # Get model prediction probabilities
-            proba = model.predict_proba(X)[0]
-            max_confidence = max(proba)
-            
-            # Base risk based on predicted disaster type
-            # If "Low Risk" is predicted, start with low base risk
-            # If a disaster is predicted, start with high base risk
-            if label == "Low Risk":
-                base_risk = 20  # Low base risk for safe conditions
-            elif "Flood" in label or "Cyclone" in label or "Drought" in label:
-                base_risk = 65  # High base risk for disaster predictions
-            else:
-                base_risk = 40  # Medium risk for unknown predictions
-            
-            print(f"[INFO] Predicted label: {label}")
-            print(f"[INFO] Base risk from prediction: {base_risk}")
-            print(f"[INFO] Model confidence: {max_confidence * 100:.2f}%")
-
-            # Weather-based risk adjustments (more granular)
-            weather_risk = 0
-
-            # Rainfall risk (flood indicator)
-            if weather["rainfall"] > 70:
-                weather_risk += 20
-            elif weather["rainfall"] > 50:
-                weather_risk += 12
-            elif weather["rainfall"] > 30:
-                weather_risk += 6
-            elif weather["rainfall"] > 10:
-                weather_risk += 2
-
-            # Wind speed risk (cyclone indicator)
-            if weather["wind_speed"] > 30:
-                weather_risk += 20
-            elif weather["wind_speed"] > 25:
-                weather_risk += 15
-            elif weather["wind_speed"] > 15:
-                weather_risk += 8
-            elif weather["wind_speed"] > 8:
-                weather_risk += 3
-
-            # Temperature risk (drought/extreme heat indicator)
-            if weather["temperature"] > 40:
-                weather_risk += 15
-            elif weather["temperature"] > 38:
-                weather_risk += 10
-            elif weather["temperature"] < -5:
-                weather_risk += 12
-            elif weather["temperature"] < 0:
-                weather_risk += 8
-
-            # Pressure risk (storm indicator)
-            if weather["pressure"] < 970:
-                weather_risk += 15
-            elif weather["pressure"] < 980:
-                weather_risk += 10
-            elif weather["pressure"] < 1000:
-                weather_risk += 5
-
-            # Humidity risk (flood/storm indicator)
-            if weather["humidity"] > 90:
-                weather_risk += 8
-            elif weather["humidity"] > 85:
-                weather_risk += 5
-            elif weather["humidity"] < 30 and weather["temperature"] > 35:
-                weather_risk += 5  # Drought conditions
-
-            # Apply model confidence as a multiplier (0.8 to 1.2 range)
-            # Higher confidence increases risk, lower confidence decreases it
-            confidence_multiplier = 0.8 + (max_confidence * 0.4)
-            
-            # Calculate final risk score
-            total_risk = (base_risk + weather_risk) * confidence_multiplier
-            risk = min(round(total_risk, 2), 100)
-            
-            print(f"[INFO] Weather risk adjustment: {weather_risk}")
-            print(f"[INFO] Confidence multiplier: {confidence_multiplier:.2f}")
-            print(f"[INFO] Final risk score: {risk}")
-
-        except Exception as e:
-            print("[ERROR] Risk calculation failed:", e)
-            traceback.print_exc()
-            risk = 50
-            print(f"[INFO] Using default risk score: {risk}")
-
-
-        # Ensure risk_score is a valid number
-        risk_score = float(risk) if risk is not None else 50.0
-        risk_score = max(0, min(100, risk_score))  # Clamp between 0 and 100
-
         # Response
         response_data = {
             "city": location["city"],
@@ -268,7 +390,8 @@ def predict():
             "wind_speed": weather["wind_speed"],
             "pressure": weather["pressure"],
             "prediction": label,
-            "risk_score": risk_score
+            "risk_score": risk_score,
+            "stale": bool(weather.get("stale"))
         }
         
         # Save to DB
@@ -278,6 +401,9 @@ def predict():
         print(f"[INFO] Response data - risk_score: {response_data['risk_score']}")
         return jsonify(response_data), 200
 
+    except DeadlineExceeded:
+        print("[ADMISSION] /predict dropped: deadline exceeded")
+        return overloaded_response("Request deadline exceeded")
     except Exception as e:
         traceback.print_exc()
         return jsonify({
@@ -300,7 +426,81 @@ def recent_predictions():
         return jsonify({"error": "Failed to fetch recent predictions"}), 500
 
 
+@app.route("/export-predictions", methods=["GET"])
+def export_prediction_history():
+    """
+    Stream prediction history as NDJSON, CSV or Parquet (admin only)
+    Query params: format, start, end (ISO-8601, UTC unless an offset is given), email, chunk_size
+    """
+    if not is_admin_request():
+        return jsonify({"error": "Forbidden"}), 403
+
+    fmt = request.args.get("format", "ndjson")
+    try:
+        chunk_size = int(request.args.get("chunk_size", 5000))
+        chunks = export_predictions(
+            fmt,
+            start=request.args.get("start"),
+            end=request.args.get("end"),
+            email=request.args.get("email"),
+            chunk_size=max(1, min(chunk_size, 50000)),
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    print(f"[INFO] Streaming prediction export ({fmt})")
+    return Response(
+        stream_with_context(chunks),
+        mimetype=EXPORT_FORMATS[fmt],
+        headers={"Content-Disposition": f"attachment; filename=predictions.{fmt}"},
+    )
+
+
+@app.route("/locations/autocomplete", methods=["GET"])
+def locations_autocomplete():
+    """
+    Typeahead suggestions from the offline gazetteer
+    Query params: q (min 2 chars, or a 6-digit pincode), limit
+    """
+    query = request.args.get("q", "").strip()
+    if len(query) < 2:
+        return jsonify([]), 200
+    try:
+        limit = max(1, min(int(request.args.get("limit", 8)), 25))
+    except ValueError:
+        return jsonify({"error": "Invalid limit"}), 400
+    return jsonify(get_gazetteer().autocomplete(query, limit)), 200
+
+
+@app.route("/locations/reverse", methods=["POST"])
+@admission_control(reverse_limiter)
+def locations_reverse():
+    """
+    Batch reverse geocode: {"coords": [[lat, lon], ...]} (max 1000 pairs)
+    Gazetteer only; points with no place nearby come back as null
+    (up to REVERSE_BATCH_REMOTE_MAX of them may use LocationIQ instead)
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": "JSON object with a coords list required"}), 400
+    coords = data.get("coords")
+    if not isinstance(coords, list) or not coords:
+        return jsonify({"error": "coords list required"}), 400
+    if len(coords) > 1000:
+        return jsonify({"error": "At most 1000 coordinates per request"}), 400
+
+    points = []
+    for pair in coords:
+        point = parse_coordinates(*pair) if isinstance(pair, list) and len(pair) == 2 else None
+        if point is None:
+            return jsonify({"error": "coords must be [lat, lon] pairs, finite, lat in [-90, 90], lon in [-180, 180]"}), 400
+        points.append(point)
+
+    return jsonify(reverse_geocode_many(points, remote_limit=REVERSE_BATCH_REMOTE_MAX)), 200
+
+
 @app.route("/weather-trends", methods=["POST", "OPTIONS"])
+@admission_control(weather_trends_limiter)
 def weather_trends():
     """
     Get hourly weather trends for a location (past + future hours)
@@ -330,6 +530,7 @@ def weather_trends():
 
         # Resolve Location
         location = resolve_location(user_input)
+        check_deadline()
         if not location or not location.get("city"):
             print(f"[ERROR] Location not found: {user_input}")
             return jsonify({"error": "Location not found"}), 400
@@ -338,6 +539,7 @@ def weather_trends():
 
         # Fetch Weather Trends
         trends = get_weather_trends(location["lat"], location["lon"], date_str)
+        check_deadline()
         if not trends:
             print("[ERROR] Weather trends fetch returned None")
             return jsonify({"error": "Weather trends fetch failed"}), 400
@@ -349,11 +551,15 @@ def weather_trends():
             "district": location.get("district", ""),
             "state": location.get("state", ""),
             "date": trends["date"],
-            "hourly": trends["hourly"]
+            "hourly": trends["hourly"],
+            "stale": bool(trends.get("stale"))
         }
         
         return jsonify(response_data), 200
 
+    except DeadlineExceeded:
+        print("[ADMISSION] /weather-trends dropped: deadline exceeded")
+        return overloaded_response("Request deadline exceeded")
     except Exception as e:
         print(f"[ERROR] Weather trends error: {e}")
         traceback.print_exc()
@@ -362,6 +568,48 @@ def weather_trends():
             "details": str(e)
         }), 500
 
+# -------------------------------------------------------
+# Admin Routes
+# -------------------------------------------------------
+@app.route("/admin/stats", methods=["GET"])
+def admin_stats():
+    """
+    Prediction cache and admission control counters (admin only)
+    """
+    if not is_admin_request():
+        return jsonify({"error": "Forbidden"}), 403
+    return jsonify({
+        "prediction_cache": prediction_cache.stats(),
+        "admission": {
+            limiter.name: limiter.stats()
+            for limiter in (predict_limiter, weather_trends_limiter, reverse_limiter)
+        }
+    }), 200
+
+
+@app.route("/admin/profiles", methods=["GET"])
+def admin_profiles():
+    """
+    Recent request profiles with their hottest functions (admin only)
+    """
+    if not is_admin_request():
+        return jsonify({"error": "Forbidden"}), 403
+    try:
+        limit = max(1, min(int(request.args.get("limit", 20)), 200))
+    except ValueError:
+        return jsonify({"error": "Invalid limit"}), 400
+    return jsonify(list_profiles(limit)), 200
+
+
+@app.route("/admin/profiles/<profile_id>", methods=["GET"])
+def admin_profile_download(profile_id):
+    """
+    Raw pstats file for one profile (admin only)
+    """
+    if not is_admin_request():
+        return jsonify({"error": "Forbidden"}), 403
+    return send_from_directory(PROFILE_DIR, f"{profile_id}.prof", as_attachment=True)
+
 # -------------------------------------------------------
 # Run (Only for local development)
 # -------------------------------------------------------
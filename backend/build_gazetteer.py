@@ -0,0 +1,123 @@
+# build_gazetteer.py
+"""
+Build gazetteer_in.csv (see gazetteer.py) from GeoNames data.
+
+Sources (GeoNames, CC BY 4.0, https://www.geonames.org):
+    places   https://download.geonames.org/export/dump/IN.zip          populated places (feature class P)
+    states   https://download.geonames.org/export/dump/admin1CodesASCII.txt
+    districts https://download.geonames.org/export/dump/admin2Codes.txt
+    pincodes https://download.geonames.org/export/zip/IN.zip           Indian postal codes with coordinates
+
+Usage:
+    python build_gazetteer.py                      # download everything, write gazetteer_in.csv
+    python build_gazetteer.py --places IN.zip --pincodes postal_IN.zip --admin1 admin1CodesASCII.txt --admin2 admin2Codes.txt
+
+Any source may be a URL or a local path (.zip or the extracted .txt).
+The output is deterministic for the same inputs, so it can be committed
+or rebuilt in CI.
+"""
+import argparse
+import csv
+import io
+import os
+import re
+import zipfile
+
+import requests
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+PLACES_URL = "https://download.geonames.org/export/dump/IN.zip"
+ADMIN1_URL = "https://download.geonames.org/export/dump/admin1CodesASCII.txt"
+ADMIN2_URL = "https://download.geonames.org/export/dump/admin2Codes.txt"
+PINCODES_URL = "https://download.geonames.org/export/zip/IN.zip"
+
+COLUMNS = ["name", "district", "state", "pincode", "lat", "lon", "population"]
+
+# Postal place names are post offices: "Salem H.O", "Andheri East S.O", "Mumbai G.P.O."
+_POST_OFFICE_SUFFIX = re.compile(r"\s+\(?(?:[HSB]\.?\s?O|G\.?\s?P\.?\s?O)\.?\)?$", re.IGNORECASE)
+
+
+def read_source(source, member="IN.txt"):
+    """Text of a URL or local file; zips are unpacked to `member`"""
+    if source.startswith(("http://", "https://")):
+        print(f"[INFO] Downloading {source}")
+        res = requests.get(source, timeout=120)
+        res.raise_for_status()
+        data = res.content
+    else:
+        with open(source, "rb") as f:
+            data = f.read()
+
+    if data[:2] == b"PK":
+        with zipfile.ZipFile(io.BytesIO(data)) as zf:
+            data = zf.read(member)
+    return data.decode("utf-8")
+
+
+def tsv_rows(text):
+    for line in text.splitlines():
+        if line and not line.startswith("#"):
+            yield line.split("\t")
+
+
+def load_admin_names(text, prefix="IN."):
+    """code -> ASCII name, e.g. "IN.16" -> "Maharashtra" """
+    return {
+        cols[0]: cols[2] or cols[1]
+        for cols in tsv_rows(text)
+        if len(cols) >= 3 and cols[0].startswith(prefix)
+    }
+
+
+def place_rows(text, admin1, admin2, min_population=0):
+    # GeoNames dump columns: 1 name, 2 asciiname, 4 lat, 5 lon, 6 feature class,
+    # 8 country, 10 admin1, 11 admin2, 14 population
+    for cols in tsv_rows(text):
+        if len(cols) < 15 or cols[6] != "P" or cols[8] != "IN":
+            continue
+        population = int(cols[14] or 0)
+        if population < min_population:
+            continue
+        state = admin1.get(f"IN.{cols[10]}", "")
+        district = admin2.get(f"IN.{cols[10]}.{cols[11]}", "")
+        yield [cols[2] or cols[1], district, state, "", cols[4], cols[5], population]
+
+
+def pincode_rows(text):
+    # GeoNames postal columns: 1 postal code, 2 place name, 3 state, 5 district, 9 lat, 10 lon
+    for cols in tsv_rows(text):
+        if len(cols) < 11 or not cols[9] or not cols[10]:
+            continue
+        name = _POST_OFFICE_SUFFIX.sub("", cols[2]).strip() or cols[2]
+        yield [name, cols[5], cols[3], cols[1], cols[9], cols[10], 0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the offline gazetteer CSV from GeoNames")
+    parser.add_argument("--places", default=PLACES_URL)
+    parser.add_argument("--admin1", default=ADMIN1_URL)
+    parser.add_argument("--admin2", default=ADMIN2_URL)
+    parser.add_argument("--pincodes", default=PINCODES_URL)
+    parser.add_argument("--min-population", type=int, default=0)
+    parser.add_argument("--out", default=os.path.join(BASE_DIR, "gazetteer_in.csv"))
+    args = parser.parse_args()
+
+    admin1 = load_admin_names(read_source(args.admin1))
+    admin2 = load_admin_names(read_source(args.admin2))
+
+    rows = list(place_rows(read_source(args.places), admin1, admin2, args.min_population))
+    places = len(rows)
+    rows.extend(pincode_rows(read_source(args.pincodes)))
+    rows.sort(key=lambda r: (r[0], r[2], r[1], r[3]))
+
+    with open(args.out, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS)
+        writer.writerows(rows)
+
+    print(f"[OK] Wrote {places} places and {len(rows) - places} pincode rows to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
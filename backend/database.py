@@ -31,7 +31,13 @@ def init_db():
             print("[DB] Migrated recent_predictions: added email column")
         except sqlite3.OperationalError:
             pass # Column already exists
-        
+
+        # Time-window scans in get_popular_cities (prefetch)
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_recent_predictions_timestamp
+            ON recent_predictions (timestamp)
+        ''')
+
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS users (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -108,6 +114,66 @@ def get_recent_predictions(limit=5, email=None):
         print(f"[DB] Fetch error: {e}")
         return []
 
+def get_popular_cities(hours=24, limit=50):
+    """Most requested cities in the last `hours`, as (city, request_count) pairs."""
+    try:
+        conn = sqlite3.connect(DB_NAME)
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT city, COUNT(*) AS requests
+            FROM recent_predictions
+            WHERE timestamp >= datetime('now', ?)
+            GROUP BY city
+            ORDER BY requests DESC
+            LIMIT ?
+        ''', (f"-{int(hours)} hours", limit))
+        rows = cursor.fetchall()
+        conn.close()
+        return rows
+    except Exception as e:
+        print(f"[DB] Popular cities error: {e}")
+        return []
+
+def iter_predictions(start=None, end=None, email=None, chunk_size=5000):
+    """
+    Stream predictions in id order, yielding one chunk (list of dicts) at a time.
+    start/end must already be in the stored 'YYYY-MM-DD HH:MM:SS' form
+    (export.parse_bound).
+    Keyset pagination keeps memory constant and releases the read lock
+    between chunks, so live /predict writes are never blocked by an export.
+    """
+    filters = ""
+    params = []
+    if start:
+        filters += " AND timestamp >= ?"
+        params.append(start)
+    if end:
+        filters += " AND timestamp < ?"
+        params.append(end)
+    if email:
+        filters += " AND email = ?"
+        params.append(email)
+
+    conn = sqlite3.connect(DB_NAME)
+    conn.row_factory = sqlite3.Row
+    try:
+        last_id = 0
+        while True:
+            cursor = conn.execute(f'''
+                SELECT id, email, city, prediction, risk_score, timestamp
+                FROM recent_predictions
+                WHERE id > ?{filters}
+                ORDER BY id
+                LIMIT ?
+            ''', (last_id, *params, chunk_size))
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            yield [dict(row) for row in rows]
+            last_id = rows[-1]["id"]
+    finally:
+        conn.close()
+
 def create_user(email, password_hash, full_name=None):
     """Create a new user in the database."""
     try:
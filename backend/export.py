@@ -0,0 +1,156 @@
+"""
+Streaming export of prediction history (NDJSON / CSV / Parquet).
+
+CLI usage:
+    python export.py --format csv --start 2026-01-01 --end 2026-02-01 --out history.csv
+"""
+import argparse
+import csv
+import io
+import json
+import sys
+from datetime import datetime, timezone
+
+from database import iter_predictions
+
+COLUMNS = ["id", "email", "city", "prediction", "risk_score", "timestamp"]
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def _ndjson_chunks(chunks):
+    for rows in chunks:
+        yield "".join(json.dumps(row) + "\n" for row in rows).encode()
+
+
+def _csv_chunks(chunks):
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=COLUMNS)
+    writer.writeheader()
+    for rows in chunks:
+        writer.writerows(rows)
+        yield buf.getvalue().encode()
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue().encode()
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object that hands written bytes back to the generator."""
+
+    def __init__(self):
+        self.parts = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data = b"".join(self.parts)
+        self.parts = []
+        return data
+
+
+def _parquet_chunks(chunks, pa, pq):
+    schema = pa.schema([
+        ("id", pa.int64()),
+        ("email", pa.string()),
+        ("city", pa.string()),
+        ("prediction", pa.string()),
+        ("risk_score", pa.float64()),
+        ("timestamp", pa.string()),
+    ])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    try:
+        # One row group per chunk, flushed as soon as it is written
+        for rows in chunks:
+            writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def parse_bound(value, name):
+    """
+    ISO-8601 date or timestamp -> the 'YYYY-MM-DD HH:MM:SS' UTC text SQLite
+    stores in recent_predictions.timestamp, so range filters compare correctly
+    """
+    if not value:
+        return None
+    text = value.strip()
+    if text.endswith(("Z", "z")):
+        text = text[:-1] + "+00:00"
+    try:
+        moment = datetime.fromisoformat(text)
+    except ValueError:
+        raise ValueError(f"Invalid {name}: {value!r} (expected ISO-8601, e.g. 2026-01-01 or 2026-01-01T06:00:00Z)")
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def export_predictions(fmt, start=None, end=None, email=None, chunk_size=5000):
+    """
+    Generator of encoded byte chunks for the requested format.
+    Raises ValueError up front for an unknown format or a malformed start/end.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    start = parse_bound(start, "start")
+    end = parse_bound(end, "end")
+
+    if fmt == "parquet":
+        # Optional dependency, checked up front so the HTTP route can still return a 400
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ValueError("Parquet export requires pyarrow (pip install pyarrow)")
+
+    chunks = iter_predictions(start, end, email, chunk_size)
+    if fmt == "ndjson":
+        return _ndjson_chunks(chunks)
+    if fmt == "csv":
+        return _csv_chunks(chunks)
+    return _parquet_chunks(chunks, pa, pq)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export prediction history")
+    parser.add_argument("--format", choices=sorted(EXPORT_FORMATS), default="ndjson")
+    parser.add_argument("--start", help="Inclusive lower bound (ISO-8601, UTC unless an offset is given), e.g. 2026-01-01 or 2026-01-01T06:00:00")
+    parser.add_argument("--end", help="Exclusive upper bound, same format as --start")
+    parser.add_argument("--email", help="Only export predictions for this user")
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    parser.add_argument("--out", required=True, help="Output file")
+    args = parser.parse_args()
+
+    try:
+        chunks = export_predictions(args.format, args.start, args.end, args.email, args.chunk_size)
+    except ValueError as e:
+        print(f"[ERROR] {e}")
+        sys.exit(1)
+
+    with open(args.out, "wb") as out:
+        for data in chunks:
+            out.write(data)
+    print(f"[OK] Exported predictions to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+"""
+Offline gazetteer of Indian places and pincodes.
+
+Loaded from a CSV (GAZETTEER_PATH, built by build_gazetteer.py from
+GeoNames) with the header:
+    name,district,state,pincode,lat,lon,population
+pincode and population may be empty. A place with several pincodes can
+appear on several rows.
+
+Names are kept in a sorted array so exact and prefix lookups are a
+bisect away; pincodes live in a plain dict. Short prefixes (where the
+bisect range is huge) get a precomputed population-ordered top list for
+autocomplete. Place centroids go into a haversine BallTree for
+nearest-place reverse geocoding.
+"""
+import csv
+import heapq
+import os
+import re
+import threading
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+from sklearn.neighbors import BallTree
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+GAZETTEER_PATH = os.path.join(BASE_DIR, os.getenv("GAZETTEER_PATH", "gazetteer_in.csv"))
+GAZETTEER_MIN_PREFIX = int(os.getenv("GAZETTEER_MIN_PREFIX", 4))
+REVERSE_GEOCODE_MAX_KM = float(os.getenv("REVERSE_GEOCODE_MAX_KM", 25))
+
+EARTH_RADIUS_KM = 6371.0
+
+# Prefixes up to this length use the precomputed autocomplete lists
+SHORT_PREFIX_LEN = 3
+AUTOCOMPLETE_MAX = 25
+
+_PINCODE_RE = re.compile(r"^\d{6}$")
+
+
+def normalize(text):
+    return " ".join(str(text).casefold().replace(".", " ").split())
+
+
+class Gazetteer:
+    def __init__(self, rows=()):
+        # places[i] = (city, district, state, lat, lon, population)
+        self.places = []
+        self.pincodes = {}
+        seen = {}
+        pairs = []
+
+        for row in rows:
+            try:
+                name = row["name"].strip()
+                lat = float(row["lat"])
+                lon = float(row["lon"])
+            except (KeyError, TypeError, ValueError):
+                continue
+            if not name:
+                continue
+            district = (row.get("district") or "").strip()
+            state = (row.get("state") or "").strip()
+            try:
+                population = int(float(row.get("population") or 0))
+            except ValueError:
+                population = 0
+
+            place_key = (name, district, state)
+            idx = seen.get(place_key)
+            if idx is None:
+                idx = len(self.places)
+                seen[place_key] = idx
+                self.places.append((name, district, state, lat, lon, population))
+                pairs.append((normalize(name), idx))
+
+            pincode = (row.get("pincode") or "").strip()
+            if _PINCODE_RE.match(pincode):
+                self.pincodes.setdefault(pincode, idx)
+
+        pairs.sort()
+        self.keys = [k for k, _ in pairs]
+        self.key_places = [i for _, i in pairs]
+
+        # prefix -> key indexes of its most populous places, best first
+        groups = {}
+        for k, key in enumerate(self.keys):
+            for n in range(1, min(SHORT_PREFIX_LEN, len(key)) + 1):
+                groups.setdefault(key[:n], []).append(k)
+        self.short_prefixes = {
+            prefix: heapq.nlargest(AUTOCOMPLETE_MAX, ks, key=self._rank)
+            for prefix, ks in groups.items()
+        }
+
+        self.tree = None
+        if self.places:
+            coords = np.radians([[p[3], p[4]] for p in self.places])
+            self.tree = BallTree(coords, metric="haversine")
+
+    def __len__(self):
+        return len(self.places)
+
+    def _as_location(self, idx):
+        city, district, state, lat, lon, _ = self.places[idx]
+        return {
+            "city": city,
+            "district": district,
+            "state": state,
+            "lat": lat,
+            "lon": lon
+        }
+
+    def _rank(self, k):
+        """Sort key for autocomplete: population, then alphabetical"""
+        return (self.places[self.key_places[k]][5], -k)
+
+    def _prefix_range(self, prefix):
+        lo = bisect_left(self.keys, prefix)
+        hi = bisect_left(self.keys, prefix + "\uffff", lo)
+        return lo, hi
+
+    def _best(self, candidates, qualifier=""):
+        """
+        Most populous candidate whose district/state matches the qualifier.
+        None if a qualifier was given and nothing matches it, so the query
+        falls through to LocationIQ instead of resolving to the wrong state.
+        """
+        if qualifier:
+            candidates = [
+                i for i in candidates
+                if qualifier in normalize(self.places[i][1]) or qualifier in normalize(self.places[i][2])
+            ]
+        return max(candidates, key=lambda i: self.places[i][5], default=None)
+
+    def lookup(self, query, allow_prefix=True):
+        """
+        Resolve a pincode, exact place name or (optionally) a name prefix.
+        Accepts "Place, District/State". Returns None when unresolved.
+        """
+        text = str(query).strip()
+        if _PINCODE_RE.match(text):
+            idx = self.pincodes.get(text)
+            return self._as_location(idx) if idx is not None else None
+
+        name, _, qualifier = text.partition(",")
+        name = normalize(name)
+        qualifier = normalize(qualifier)
+        if not name:
+            return None
+
+        lo, hi = self._prefix_range(name)
+        exact_hi = bisect_right(self.keys, name, lo, hi)
+        best = self._best(self.key_places[lo:exact_hi], qualifier)
+        if best is None and allow_prefix and len(name) >= GAZETTEER_MIN_PREFIX:
+            best = self._best(self.key_places[lo:hi], qualifier)
+        return self._as_location(best) if best is not None else None
+
+    def autocomplete(self, prefix, limit=10):
+        """Top `limit` places by population whose name starts with prefix"""
+        text = str(prefix).strip()
+        if text.isdigit():
+            idx = self.pincodes.get(text) if len(text) == 6 else None
+            return [self._as_location(idx)] if idx is not None else []
+
+        key = normalize(text)
+        if not key:
+            return []
+        if len(key) <= SHORT_PREFIX_LEN:
+            top = self.short_prefixes.get(key, [])[:limit]
+        else:
+            lo, hi = self._prefix_range(key)
+            top = heapq.nlargest(limit, range(lo, hi), key=self._rank)
+        return [self._as_location(self.key_places[k]) for k in top]
+
+    def nearest_many(self, coords, max_km=REVERSE_GEOCODE_MAX_KM):
+        """
+        Nearest place for each (lat, lon), with the place's own centroid as
+        lat/lon so every point near a place shares its weather and prediction
+        cache entries. Entries farther than max_km from any known place come
+        back as None.
+        """
+        if self.tree is None or len(coords) == 0:
+            return [None] * len(coords)
+
+        points = np.radians(np.asarray(coords, dtype=float).reshape(-1, 2))
+        dist, ind = self.tree.query(points, k=1)
+        return [
+            self._as_location(int(i)) if d * EARTH_RADIUS_KM <= max_km else None
+            for d, i in zip(dist[:, 0], ind[:, 0])
+        ]
+
+    def nearest(self, lat, lon, max_km=REVERSE_GEOCODE_MAX_KM):
+        return self.nearest_many([(float(lat), float(lon))], max_km)[0]
+
+
+def load_gazetteer(path=GAZETTEER_PATH):
+    if not os.path.exists(path):
+        print(f"[WARN] Gazetteer not found at {path}, all lookups go to LocationIQ")
+        return Gazetteer()
+    try:
+        with open(path, newline="", encoding="utf-8") as f:
+            gazetteer = Gazetteer(csv.DictReader(f))
+        print(f"[OK] Gazetteer loaded: {len(gazetteer)} places, {len(gazetteer.pincodes)} pincodes")
+        return gazetteer
+    except Exception as e:
+        print(f"[ERROR] Gazetteer load failed ({e})")
+        return Gazetteer()
+
+
+_gazetteer = None
+_gazetteer_lock = threading.Lock()
+
+
+def get_gazetteer():
+    global _gazetteer
+    if _gazetteer is None:
+        with _gazetteer_lock:
+            if _gazetteer is None:
+                _gazetteer = load_gazetteer()
+    return _gazetteer
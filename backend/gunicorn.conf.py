@@ -0,0 +1,28 @@
+"""
+Gunicorn settings, picked up automatically when started from this directory:
+    gunicorn app:app
+
+Admission control (admission.py) counts requests per worker process, so it
+only sheds load with threaded workers: each worker needs more threads than
+PREDICT_MAX_CONCURRENCY + PREDICT_MAX_QUEUE, otherwise excess requests wait
+in gunicorn's socket backlog instead of getting a fast 503. The extra
+threads serve the other routes while /predict is saturated.
+"""
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".env"))
+
+bind = f"0.0.0.0:{os.getenv('PORT', 5000)}"
+workers = int(os.getenv("GUNICORN_WORKERS", 2))
+worker_class = "gthread"
+threads = int(os.getenv(
+    "GUNICORN_THREADS",
+    int(os.getenv("PREDICT_MAX_CONCURRENCY", 8)) + int(os.getenv("PREDICT_MAX_QUEUE", 16)) + 8
+))
+
+# Admitted requests give up at REQUEST_DEADLINE; the worker timeout only
+# catches a worker that is truly stuck
+timeout = int(float(os.getenv("REQUEST_DEADLINE", 20))) + 30
+graceful_timeout = 30
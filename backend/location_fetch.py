@@ -1,15 +1,33 @@
 import requests
 import traceback
 import os
+from gazetteer import get_gazetteer, normalize
+from admission import upstream_timeout, deadline_expired
+from quota import acquire, remember, recall, INTERACTIVE, BACKGROUND, GEOCODE_CACHE_MAX_AGE
 
 LOCATIONIQ_API_KEY = os.getenv("LOCATIONIQ_API_KEY")
 
-def resolve_location(user_input):
+def resolve_location(user_input, priority=INTERACTIVE):
     """
     Resolves city / village / pincode / free text into:
     city, district, state, lat, lon
+    Local gazetteer first, LocationIQ only for unresolved queries
     """
 
+    local = get_gazetteer().lookup(user_input)
+    if local:
+        print(f"[INFO] Gazetteer hit: {user_input} -> {local['city']}")
+        return local
+
+    cache_key = f"locationiq:search:{normalize(user_input)}"
+    cached = recall(cache_key, GEOCODE_CACHE_MAX_AGE)
+    if cached:
+        return cached
+    if deadline_expired():
+        return None
+    if not acquire("locationiq", priority):
+        return recall(cache_key)
+
     try:
         url = "https://us1.locationiq.com/v1/search"
         params = {
@@ -22,7 +40,7 @@ def resolve_location(user_input):
             "countrycodes": "in"
         }
 
-        response = requests.get(url, params=params, timeout=10)
+        response = requests.get(url, params=params, timeout=upstream_timeout(10))
         data = response.json()
 
         if response.status_code != 200 or not data:
@@ -40,23 +58,48 @@ def resolve_location(user_input):
             or address.get("state")
         )
 
-        return {
+        location = {
             "city": city,
             "district": address.get("state_district", ""),
             "state": address.get("state", ""),
             "lat": float(data[0]["lat"]),
             "lon": float(data[0]["lon"])
         }
+        remember(cache_key, location)
+        return location
 
     except Exception:
         traceback.print_exc()
         return None
 
-def reverse_geocode(lat, lon):
+def reverse_geocode(lat, lon, priority=INTERACTIVE):
     """
     Reverse geocodes lat/lon into:
     city, district, state, lat, lon
+    Nearest gazetteer place first (lat/lon become that place's centroid, the
+    same point prefetch and city-name lookups use), LocationIQ beyond
+    REVERSE_GEOCODE_MAX_KM
     """
+    try:
+        local = get_gazetteer().nearest(lat, lon)
+    except (TypeError, ValueError):
+        local = None
+    if local:
+        print(f"[INFO] Gazetteer reverse hit: {lat}, {lon} -> {local['city']}")
+        return local
+
+    try:
+        cache_key = f"locationiq:reverse:{float(lat):.3f},{float(lon):.3f}"
+    except (TypeError, ValueError):
+        return None
+    cached = recall(cache_key, GEOCODE_CACHE_MAX_AGE)
+    if cached:
+        return cached
+    if deadline_expired():
+        return None
+    if not acquire("locationiq", priority):
+        return recall(cache_key)
+
     try:
         url = "https://us1.locationiq.com/v1/reverse"
         params = {
@@ -67,7 +110,7 @@ def reverse_geocode(lat, lon):
             "addressdetails": 1
         }
         
-        response = requests.get(url, params=params, timeout=10)
+        response = requests.get(url, params=params, timeout=upstream_timeout(10))
         data = response.json()
         
         if response.status_code != 200 or not data:
@@ -84,13 +127,30 @@ def reverse_geocode(lat, lon):
             or address.get("state")
         )
         
-        return {
+        location = {
             "city": city,
             "district": address.get("state_district", ""),
             "state": address.get("state", ""),
             "lat": float(lat),
             "lon": float(lon)
         }
+        remember(cache_key, location)
+        return location
     except Exception:
         traceback.print_exc()
         return None
+
+def reverse_geocode_many(coords, remote_limit=0, priority=BACKGROUND):
+    """
+    Batch reverse geocode a list of (lat, lon) pairs.
+    One BallTree query for the whole batch. Misses stay None unless
+    remote_limit allows a few LocationIQ lookups (background priority,
+    so a batch can never starve interactive /predict of quota).
+    """
+    results = get_gazetteer().nearest_many(coords)
+    remote_calls = 0
+    for i, (lat, lon) in enumerate(coords):
+        if results[i] is None and remote_calls < remote_limit:
+            results[i] = reverse_geocode(lat, lon, priority)
+            remote_calls += 1
+    return results
@@ -0,0 +1,176 @@
+# model_benchmark.py
+"""
+Model size vs latency sweep.
+
+Trains a grid of model variants on the same synthetic data as
+model_train.py and reports holdout accuracy, single-row and batch
+inference latency, pickled size and load time. Variants on the Pareto
+front (no other variant is at least as accurate, as fast and as small)
+are marked with '*'.
+
+Usage:
+    python model_benchmark.py --samples 5000 --accuracy-bar 0.97 --csv sweep.csv
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import ExtraTreesClassifier, HistGradientBoostingClassifier, RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import train_test_split
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import LabelEncoder, StandardScaler
+from sklearn.tree import DecisionTreeClassifier
+
+from model_train import FEATURES, generate_data
+
+
+def build_variants():
+    """name -> unfitted estimator"""
+    variants = {}
+    for n_estimators in (10, 25, 50, 100):
+        for max_depth in (None, 6, 10):
+            for min_samples_leaf in (1, 5):
+                name = f"rf n={n_estimators} depth={max_depth} leaf={min_samples_leaf}"
+                variants[name] = RandomForestClassifier(
+                    n_estimators=n_estimators,
+                    max_depth=max_depth,
+                    min_samples_leaf=min_samples_leaf,
+                    random_state=42
+                )
+    for max_depth in (4, 6, 8, None):
+        variants[f"tree depth={max_depth}"] = DecisionTreeClassifier(max_depth=max_depth, random_state=42)
+    for n_estimators in (25, 100):
+        variants[f"extra-trees n={n_estimators}"] = ExtraTreesClassifier(n_estimators=n_estimators, random_state=42)
+    variants["hist-gbm"] = HistGradientBoostingClassifier(random_state=42)
+    variants["logreg"] = make_pipeline(StandardScaler(), LogisticRegression(max_iter=1000))
+    return variants
+
+
+def _median_seconds(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def benchmark(model, X_train, y_train, X_test, y_test, repeat=50, batch_size=1000):
+    model.fit(X_train, y_train)
+    accuracy = float((model.predict(X_test) == y_test).mean())
+
+    # Same shape as app.py: a one-row DataFrame, predict + predict_proba
+    row = X_test.iloc[[0]]
+    single = _median_seconds(lambda: (model.predict(row), model.predict_proba(row)), repeat)
+
+    batch = X_test.sample(batch_size, replace=True, random_state=0)
+    batch_time = _median_seconds(lambda: model.predict_proba(batch), max(3, repeat // 10))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "model.pkl")
+        joblib.dump(model, path)
+        size = os.path.getsize(path)
+        load = _median_seconds(lambda: joblib.load(path), max(3, repeat // 10))
+
+    return {
+        "accuracy": accuracy,
+        "single_ms": single * 1000,
+        "batch_ms": batch_time * 1000,
+        "size_kb": size / 1024,
+        "load_ms": load * 1000
+    }
+
+
+def pareto_front(results):
+    """Names of variants not dominated on (accuracy up, single_ms down, size_kb down)"""
+    front = set()
+    for name, r in results.items():
+        dominated = False
+        for other_name, o in results.items():
+            if other_name == name:
+                continue
+            no_worse = (
+                o["accuracy"] >= r["accuracy"]
+                and o["single_ms"] <= r["single_ms"]
+                and o["size_kb"] <= r["size_kb"]
+            )
+            better = (
+                o["accuracy"] > r["accuracy"]
+                or o["single_ms"] < r["single_ms"]
+                or o["size_kb"] < r["size_kb"]
+            )
+            if no_worse and better:
+                dominated = True
+                break
+        if not dominated:
+            front.add(name)
+    return front
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark model variants for size vs latency")
+    parser.add_argument(
+        "--samples", type=int, default=5000,
+        help="Rows of synthetic data; Drought Risk is ~0.4%% of rows, so use 2000+ for a meaningful holdout"
+    )
+    parser.add_argument("--test-size", type=float, default=0.25)
+    parser.add_argument("--repeat", type=int, default=50, help="Timing repetitions for single-row inference")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--accuracy-bar", type=float, default=0.97)
+    parser.add_argument("--filter", help="Only run variants whose name contains this text")
+    parser.add_argument("--csv", help="Also write the table to this CSV file")
+    args = parser.parse_args()
+
+    df = generate_data(args.samples)
+    y = LabelEncoder().fit_transform(df["label"])
+
+    # Stratifying needs 2+ rows per class and a test split with room for every class;
+    # rare labels (Drought Risk) break that for small --samples
+    counts = np.bincount(y)
+    can_stratify = counts.min() >= 2 and int(len(y) * args.test_size) >= len(counts)
+    if not can_stratify:
+        print(f"[WARN] Too few rows per class to stratify (smallest class: {counts.min()}), using a plain split")
+    X_train, X_test, y_train, y_test = train_test_split(
+        df[FEATURES], y, test_size=args.test_size, random_state=42,
+        stratify=y if can_stratify else None
+    )
+
+    results = {}
+    for name, model in build_variants().items():
+        if args.filter and args.filter not in name:
+            continue
+        print(f"[INFO] Benchmarking {name}")
+        results[name] = benchmark(model, X_train, y_train, X_test, y_test, args.repeat, args.batch_size)
+
+    if not results:
+        print("[ERROR] No variants matched")
+        return
+
+    front = pareto_front(results)
+    table = pd.DataFrame.from_dict(results, orient="index")
+    table["pareto"] = ["*" if name in front else "" for name in table.index]
+    table = table.sort_values(["accuracy", "single_ms"], ascending=[False, True])
+
+    print()
+    print(table.to_string(float_format=lambda v: f"{v:.4f}"))
+
+    eligible = table[table["accuracy"] >= args.accuracy_bar]
+    if eligible.empty:
+        print(f"\nNo variant reaches the accuracy bar of {args.accuracy_bar}")
+    else:
+        cheapest = eligible.sort_values(["single_ms", "size_kb"]).index[0]
+        print(f"\nCheapest variant with accuracy >= {args.accuracy_bar}: {cheapest}")
+
+    if args.csv:
+        table.to_csv(args.csv, index_label="variant")
+        print(f"[OK] Results written to {args.csv}")
+
+
+if __name__ == "__main__":
+    main()
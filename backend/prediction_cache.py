@@ -0,0 +1,130 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from model_train import FEATURES
+
+PREDICTION_CACHE_TTL = float(os.getenv("PREDICTION_CACHE_TTL", 60))
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", 2048))
+
+
+def model_version(*paths):
+    """
+    Fingerprint of the model artifacts on disk, so a retrained
+    model never serves results cached from the previous one
+    """
+    digest = hashlib.sha256()
+    for path in paths:
+        try:
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(chunk)
+        except OSError:
+            digest.update(b"missing:" + str(path).encode())
+    return digest.hexdigest()[:12]
+
+
+def make_key(location, weather, version):
+    """
+    Cache key: resolved location + hash of the weather feature vector + model version
+    """
+    place = (
+        location.get("city", ""),
+        location.get("state", ""),
+        round(float(location["lat"]), 4),
+        round(float(location["lon"]), 4),
+    )
+    features = json.dumps([weather[f] for f in FEATURES])
+    weather_hash = hashlib.sha1(features.encode()).hexdigest()
+    return (place, weather_hash, version)
+
+
+def shared_key(key):
+    """Key for the cross-worker copy of a cached prediction in the quota store"""
+    return "prediction:" + hashlib.sha1(repr(key).encode()).hexdigest()
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class PredictionCache:
+    """
+    Bounded LRU cache with TTL and single-flight coalescing.
+    Concurrent callers for the same key wait on one computation.
+    """
+
+    def __init__(self, max_entries=PREDICTION_CACHE_SIZE, ttl=PREDICTION_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, result)
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def get_or_compute(self, key, compute):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._entries[key]
+
+            flight = self._inflight.get(key)
+            if flight is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                flight = _Flight()
+                self._inflight[key] = flight
+                self.misses += 1
+                leader = True
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        succeeded = False
+        try:
+            flight.result = compute()
+            succeeded = True
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                if succeeded:
+                    self._entries[key] = (time.monotonic() + self.ttl, flight.result)
+                    self._entries.move_to_end(key)
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+                elif flight.error is None:
+                    # BaseException (timeout, SystemExit): waiters get an error, never a cached None
+                    flight.error = RuntimeError("Prediction computation was interrupted")
+                del self._inflight[key]
+            flight.done.set()
+
+        return flight.result
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+            }
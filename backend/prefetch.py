@@ -0,0 +1,190 @@
+"""
+Popularity-driven background prefetch.
+
+A daemon thread picks the most requested cities from recent_predictions,
+resolves them and refreshes their current weather (and, through the warm
+callback, their risk) before users ask. Both land in the shared quota
+store, so every worker serves them warm, and they are keyed by the
+resolved place's centroid, which is also where GPS requests near that
+place fetch weather. Upstream calls use the BACKGROUND
+quota class, so prefetching never eats into the interactive reserve.
+
+Each city gets its own refresh interval: busier cities and cities whose
+weather is changing quickly are refreshed more often. Together the
+intervals are sized to the background share of the OpenWeather budget,
+so the schedule itself stays within the quota instead of relying on
+acquire() to refuse the excess.
+
+Only one worker per host runs the loop at a time (lease in the quota store).
+"""
+import math
+import os
+import threading
+import time
+import traceback
+import uuid
+
+from database import get_popular_cities
+from location_fetch import resolve_location
+from quota import BACKGROUND, acquire_lease, background_rate
+from weather_fetch import get_current_weather, WEATHER_FRESH_MAX_AGE
+
+PREFETCH_ENABLED = os.getenv("PREFETCH_ENABLED", "0") == "1"
+PREFETCH_TOP_N = int(os.getenv("PREFETCH_TOP_N", 50))
+PREFETCH_WINDOW_HOURS = int(os.getenv("PREFETCH_WINDOW_HOURS", 24))
+PREFETCH_TICK = float(os.getenv("PREFETCH_TICK", 30))
+PREFETCH_MIN_INTERVAL = float(os.getenv("PREFETCH_MIN_INTERVAL", 120))
+PREFETCH_MAX_INTERVAL = float(os.getenv("PREFETCH_MAX_INTERVAL", 3600))
+
+LEASE_NAME = "prefetch"
+# Renewed before every city, so it only has to outlast one city's upstream
+# calls (geocode + weather, 10 s timeout each) plus the wait between ticks
+LEASE_TTL = max(PREFETCH_TICK * 3, 60)
+
+# Change in each feature that counts as "one unit" of volatility
+VOLATILITY_SCALE = {
+    "temperature": 2.0,
+    "humidity": 10.0,
+    "rainfall": 5.0,
+    "wind_speed": 5.0,
+    "pressure": 3.0
+}
+
+
+def volatility(previous, current):
+    """Mean scaled change between two weather snapshots (0 = unchanged)"""
+    if not previous or not current:
+        return 0.0
+    changes = [
+        abs(current[f] - previous[f]) / scale
+        for f, scale in VOLATILITY_SCALE.items()
+        if current.get(f) is not None and previous.get(f) is not None
+    ]
+    return sum(changes) / len(changes) if changes else 0.0
+
+
+def refresh_interval(requests_per_hour, weather_volatility):
+    """
+    Seconds until the next refresh: shorter for busy or volatile places.
+    Capped so the refresh (which lands on the next tick after it is due)
+    happens before WEATHER_FRESH_MAX_AGE, otherwise interactive requests
+    would stop reading the prefetched weather before it is replaced. Only
+    budget_stretch() may push it past that, when the quota cannot keep
+    every popular city fresh.
+    """
+    longest = max(PREFETCH_TICK, min(PREFETCH_MAX_INTERVAL, WEATHER_FRESH_MAX_AGE - PREFETCH_TICK))
+    interval = longest / (1 + math.log1p(requests_per_hour)) / (1 + weather_volatility)
+    return min(longest, max(PREFETCH_MIN_INTERVAL, interval))
+
+
+def budget_stretch(intervals, budget_per_second):
+    """
+    Factor to multiply every desired interval by so the refreshes fit the
+    background budget (1 when they already do). Stretching all of them by
+    the same factor keeps the larger share for busy and volatile cities.
+    """
+    needed = sum(1 / seconds for seconds in intervals)
+    return max(1.0, needed / budget_per_second)
+
+
+class Prefetcher:
+    def __init__(self, warm=None):
+        """
+        warm: optional callable(location, weather) run after each refresh,
+        e.g. to precompute the prediction for that snapshot
+        """
+        self.warm = warm
+        self.holder = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        # city -> {"location", "weather", "volatility", "next_due"}
+        self.state = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="prefetch", daemon=True)
+        self._thread.start()
+        print(f"[PREFETCH] Started (top {PREFETCH_TOP_N}, tick {PREFETCH_TICK}s)")
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                if acquire_lease(LEASE_NAME, self.holder, LEASE_TTL):
+                    self.tick()
+            except Exception:
+                traceback.print_exc()
+            self._stop.wait(PREFETCH_TICK)
+
+    def tick(self):
+        now = time.time()
+        budget = background_rate("openweather")
+        if budget <= 0:
+            return
+        popular = get_popular_cities(PREFETCH_WINDOW_HOURS, PREFETCH_TOP_N)
+        refreshed = 0
+
+        rates = {city: requests / max(PREFETCH_WINDOW_HOURS, 1) for city, requests in popular}
+        for city in rates:
+            self.state.setdefault(city, {
+                "location": None,
+                "weather": None,
+                "volatility": 0.0,
+                "next_due": 0.0
+            })
+        stretch = budget_stretch(
+            [refresh_interval(rate, self.state[city]["volatility"]) for city, rate in rates.items()],
+            budget
+        )
+
+        for city, rate in rates.items():
+            entry = self.state[city]
+            if entry["next_due"] > now:
+                continue
+
+            # A slow upstream can stretch a tick past the lease; if another
+            # worker took over meanwhile, stop instead of refreshing twice
+            if not acquire_lease(LEASE_NAME, self.holder, LEASE_TTL):
+                print("[PREFETCH] Lease lost mid-tick, stopping")
+                break
+
+            if entry["location"] is None:
+                entry["location"] = resolve_location(city, priority=BACKGROUND)
+            location = entry["location"]
+            if not location:
+                entry["next_due"] = now + PREFETCH_MAX_INTERVAL
+                continue
+
+            weather = get_current_weather(location["lat"], location["lon"], priority=BACKGROUND, max_age=0)
+            if not weather or weather.get("stale"):
+                # Background budget spent; try again next interval
+                entry["next_due"] = now + PREFETCH_MIN_INTERVAL
+                continue
+
+            entry["volatility"] = volatility(entry["weather"], weather)
+            entry["weather"] = weather
+            entry["next_due"] = now + refresh_interval(rate, entry["volatility"]) * stretch
+            refreshed += 1
+
+            if self.warm:
+                self.warm(location, weather)
+
+        # Forget cities that dropped out of the top list
+        for city in list(self.state):
+            if city not in rates:
+                del self.state[city]
+
+        if refreshed:
+            note = f" (intervals stretched x{stretch:.1f} to fit the OpenWeather budget)" if stretch > 1 else ""
+            print(f"[PREFETCH] Refreshed {refreshed} of {len(popular)} popular cities{note}")
+
+
+def start_prefetcher(warm=None):
+    if not PREFETCH_ENABLED:
+        return None
+    prefetcher = Prefetcher(warm)
+    prefetcher.start()
+    return prefetcher
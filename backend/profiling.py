@@ -0,0 +1,148 @@
+"""
+Opt-in per-request profiling.
+
+A request is profiled when it hits one of PROFILE_PATHS and either wins
+the PROFILE_SAMPLE_RATE draw or carries "X-Profile: 1" from an admin.
+Each profile is written as a .prof file (pstats, open with snakeviz or
+python -m pstats) next to a small JSON summary of the hottest functions.
+Only the newest PROFILE_MAX_FILES profiles are kept.
+"""
+import cProfile
+import json
+import os
+import pstats
+import random
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from flask import g, request
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(BASE_DIR, "profiles"))
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", 0))
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", 50))
+PROFILE_PATHS = [p for p in os.getenv("PROFILE_PATHS", "/predict,/weather-trends").split(",") if p]
+PROFILE_TOP_N = 15
+
+# cProfile can't nest and is not free, so profile one request at a time per worker
+_profile_slot = threading.Lock()
+
+
+def _should_profile(is_admin_request):
+    if request.path not in PROFILE_PATHS or request.method == "OPTIONS":
+        return False
+    if request.headers.get("X-Profile") == "1" and is_admin_request():
+        return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+def _top_functions(stats, limit=PROFILE_TOP_N):
+    rows = []
+    for (filename, line, func), (cc, nc, tt, ct, _) in stats.stats.items():
+        rows.append({
+            "function": f"{os.path.basename(filename)}:{line}({func})",
+            "calls": nc,
+            "total_ms": round(tt * 1000, 3),
+            "cumulative_ms": round(ct * 1000, 3)
+        })
+    rows.sort(key=lambda r: r["total_ms"], reverse=True)
+    return rows[:limit]
+
+
+def _rotate():
+    profiles = sorted(f for f in os.listdir(PROFILE_DIR) if f.endswith(".prof"))
+    for name in profiles[:-max(PROFILE_MAX_FILES, 1)]:
+        profile_id = name[:-len(".prof")]
+        for ext in (".prof", ".json"):
+            try:
+                os.remove(os.path.join(PROFILE_DIR, profile_id + ext))
+            except OSError:
+                pass
+
+
+def _save(profiler, duration, status_code):
+    # Sortable by creation time, which _rotate and list_profiles rely on
+    profile_id = f"{datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')}-{uuid.uuid4().hex[:6]}"
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    prof_path = os.path.join(PROFILE_DIR, profile_id + ".prof")
+    profiler.dump_stats(prof_path)
+
+    summary = {
+        "id": profile_id,
+        "path": request.path,
+        "method": request.method,
+        "status": status_code,
+        "duration_ms": round(duration * 1000, 2),
+        "created_at": time.time(),
+        "top": _top_functions(pstats.Stats(prof_path))
+    }
+    with open(os.path.join(PROFILE_DIR, profile_id + ".json"), "w") as f:
+        json.dump(summary, f)
+
+    _rotate()
+    return profile_id
+
+
+def init_profiling(app, is_admin_request):
+    """Register the before/after hooks on the Flask app"""
+
+    @app.before_request
+    def _start_profile():
+        if not _should_profile(is_admin_request):
+            return
+        if not _profile_slot.acquire(blocking=False):
+            return
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler is active in this process
+            _profile_slot.release()
+            return
+        g.profiler = profiler
+        g.profile_started = time.perf_counter()
+
+    @app.after_request
+    def _finish_profile(response):
+        profiler = g.pop("profiler", None)
+        if profiler is None:
+            return response
+        try:
+            profiler.disable()
+            duration = time.perf_counter() - g.profile_started
+            profile_id = _save(profiler, duration, response.status_code)
+            response.headers["X-Profile-Id"] = profile_id
+            print(f"[PROFILE] {request.method} {request.path} took {duration * 1000:.1f} ms -> {profile_id}")
+        except Exception as e:
+            print(f"[PROFILE] Save failed: {e}")
+        finally:
+            _profile_slot.release()
+        return response
+
+    @app.teardown_request
+    def _abort_profile(exc):
+        # after_request is skipped if the request blew up before producing a response
+        profiler = g.pop("profiler", None)
+        if profiler is not None:
+            profiler.disable()
+            _profile_slot.release()
+
+
+def list_profiles(limit=20):
+    """Newest profile summaries first"""
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    summaries = []
+    for name in sorted(os.listdir(PROFILE_DIR), reverse=True):
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(PROFILE_DIR, name)) as f:
+                summaries.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+        if len(summaries) >= limit:
+            break
+    return summaries
@@ -0,0 +1,225 @@
+"""
+Upstream quota budgeting shared by all gunicorn workers.
+
+Each provider gets a token bucket stored in a small SQLite file, so every
+worker process on the host draws from the same budget. Background work
+(prefetch/refresh) may only spend tokens above a reserve that is kept
+for interactive requests.
+
+The same store keeps the last good upstream response per key, which
+callers fall back to when the budget is exhausted, and the predictions
+computed for those responses so every worker can reuse them.
+"""
+import json
+import os
+import sqlite3
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+QUOTA_DB_PATH = os.getenv("QUOTA_DB_PATH", os.path.join(BASE_DIR, "quota.db"))
+
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+
+# Share of each bucket that background requests may not touch
+BACKGROUND_RESERVE = float(os.getenv("QUOTA_BACKGROUND_RESERVE", 0.3))
+
+# Geocodes barely change, so reuse them for a long time before spending quota
+GEOCODE_CACHE_MAX_AGE = int(os.getenv("GEOCODE_CACHE_MAX_AGE", 30 * 86400))
+
+# How old archived weather may be when the quota forces us to serve it
+WEATHER_STALE_MAX_AGE = int(os.getenv("WEATHER_STALE_MAX_AGE", 3 * 3600))
+
+# Prune upstream_cache every this many writes (per process)
+UPSTREAM_CACHE_PRUNE_EVERY = 500
+
+# provider -> (requests per day, burst)
+PROVIDERS = {
+    "locationiq": (
+        int(os.getenv("LOCATIONIQ_QUOTA_PER_DAY", 5000)),
+        int(os.getenv("LOCATIONIQ_QUOTA_BURST", 500)),
+    ),
+    "openweather": (
+        int(os.getenv("OPENWEATHER_QUOTA_PER_DAY", 1000)),
+        int(os.getenv("OPENWEATHER_QUOTA_BURST", 100)),
+    ),
+    "open-meteo": (
+        int(os.getenv("OPEN_METEO_QUOTA_PER_DAY", 10000)),
+        int(os.getenv("OPEN_METEO_QUOTA_BURST", 1000)),
+    ),
+}
+
+
+_writes_since_prune = 0
+
+
+def _connect():
+    return sqlite3.connect(QUOTA_DB_PATH, timeout=5, isolation_level=None)
+
+
+def init_quota_store():
+    try:
+        conn = _connect()
+        # WAL lets workers read the cache while another one updates a bucket
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS quota_buckets (
+                provider TEXT PRIMARY KEY,
+                tokens REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        ''')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS upstream_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                stored_at REAL NOT NULL
+            )
+        ''')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS leases (
+                name TEXT PRIMARY KEY,
+                holder TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        ''')
+        conn.close()
+    except Exception as e:
+        print(f"[QUOTA] Init error: {e}")
+    prune_upstream_cache()
+
+
+def prune_upstream_cache():
+    """
+    Drop archived responses nobody may read any more: geocodes older than
+    GEOCODE_CACHE_MAX_AGE, everything else (weather, predictions) older than
+    WEATHER_STALE_MAX_AGE
+    """
+    now = time.time()
+    try:
+        conn = _connect()
+        deleted = conn.execute('''
+            DELETE FROM upstream_cache
+            WHERE (key LIKE 'locationiq:%' AND stored_at < ?)
+               OR (key NOT LIKE 'locationiq:%' AND stored_at < ?)
+        ''', (now - GEOCODE_CACHE_MAX_AGE, now - WEATHER_STALE_MAX_AGE)).rowcount
+        conn.close()
+        if deleted:
+            print(f"[QUOTA] Pruned {deleted} archived upstream responses")
+    except Exception as e:
+        print(f"[QUOTA] Prune error: {e}")
+
+
+def acquire(provider, priority=INTERACTIVE, cost=1):
+    """
+    Take `cost` tokens from the provider's bucket.
+    Returns False when the budget (or the background share of it) is spent.
+    Fails open if the store itself is unavailable.
+    """
+    if provider not in PROVIDERS:
+        return True
+    per_day, burst = PROVIDERS[provider]
+    rate = per_day / 86400.0
+    floor = burst * BACKGROUND_RESERVE if priority == BACKGROUND else 0
+
+    try:
+        conn = _connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            now = time.time()
+            row = conn.execute(
+                "SELECT tokens, updated_at FROM quota_buckets WHERE provider = ?",
+                (provider,)
+            ).fetchone()
+            tokens = burst if row is None else min(burst, row[0] + (now - row[1]) * rate)
+
+            allowed = tokens - cost >= floor
+            if allowed:
+                tokens -= cost
+            conn.execute(
+                "INSERT OR REPLACE INTO quota_buckets (provider, tokens, updated_at) VALUES (?, ?, ?)",
+                (provider, tokens, now)
+            )
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+    except Exception as e:
+        print(f"[QUOTA] Acquire error for {provider}: {e}")
+        return True
+
+    if not allowed:
+        print(f"[QUOTA] {provider} budget exhausted ({priority})")
+    return allowed
+
+
+def background_rate(provider):
+    """Calls per second background jobs may plan for: the daily budget above the interactive reserve"""
+    per_day, _ = PROVIDERS[provider]
+    return per_day * (1 - BACKGROUND_RESERVE) / 86400.0
+
+
+def remember(key, value):
+    """Store the last good upstream response for key"""
+    global _writes_since_prune
+    _writes_since_prune += 1
+    if _writes_since_prune >= UPSTREAM_CACHE_PRUNE_EVERY:
+        _writes_since_prune = 0
+        prune_upstream_cache()
+
+    try:
+        conn = _connect()
+        conn.execute(
+            "INSERT OR REPLACE INTO upstream_cache (key, value, stored_at) VALUES (?, ?, ?)",
+            (key, json.dumps(value), time.time())
+        )
+        conn.close()
+    except Exception as e:
+        print(f"[QUOTA] Cache store error: {e}")
+
+
+def recall(key, max_age=None):
+    """Last good upstream response for key, or None if missing / older than max_age seconds"""
+    try:
+        conn = _connect()
+        row = conn.execute(
+            "SELECT value, stored_at FROM upstream_cache WHERE key = ?",
+            (key,)
+        ).fetchone()
+        conn.close()
+    except Exception as e:
+        print(f"[QUOTA] Cache read error: {e}")
+        return None
+    if row is None:
+        return None
+    if max_age is not None and time.time() - row[1] > max_age:
+        return None
+    return json.loads(row[0])
+
+
+def acquire_lease(name, holder, ttl):
+    """
+    Claim or renew a named lease so only one worker runs a background job.
+    Returns True while `holder` owns it.
+    """
+    try:
+        conn = _connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            now = time.time()
+            row = conn.execute(
+                "SELECT holder, expires_at FROM leases WHERE name = ?",
+                (name,)
+            ).fetchone()
+            owned = row is None or row[0] == holder or row[1] < now
+            if owned:
+                conn.execute(
+                    "INSERT OR REPLACE INTO leases (name, holder, expires_at) VALUES (?, ?, ?)",
+                    (name, holder, now + ttl)
+                )
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+        return owned
+    except Exception as e:
+        print(f"[QUOTA] Lease error for {name}: {e}")
+        return False
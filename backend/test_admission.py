@@ -0,0 +1,73 @@
+import threading
+import time
+
+from flask import Flask, jsonify
+
+from admission import RouteLimiter, admission_control, ADMISSION_RETRY_AFTER
+
+def make_client(limiter, view=None):
+    app = Flask(__name__)
+
+    @app.route("/work", methods=["POST"])
+    @admission_control(limiter)
+    def work():
+        if view:
+            view()
+        return jsonify({"ok": True})
+
+    return app.test_client()
+
+def test_full_queue_is_shed_with_retry_after():
+    limiter = RouteLimiter("test", max_concurrency=1, max_queue=0)
+    client = make_client(limiter)
+    assert limiter.acquire(0)  # another request holds the only slot
+    try:
+        res = client.post("/work")
+    finally:
+        limiter.release()
+
+    assert res.status_code == 503
+    assert res.headers["Retry-After"] == str(ADMISSION_RETRY_AFTER)
+    assert limiter.stats()["rejected"] == 1
+    assert client.post("/work").status_code == 200
+
+def test_queued_request_runs_when_a_slot_frees():
+    limiter = RouteLimiter("test", max_concurrency=1, max_queue=1)
+    client = make_client(limiter)
+    assert limiter.acquire(0)
+    threading.Timer(0.1, limiter.release).start()
+
+    assert client.post("/work").status_code == 200
+    assert limiter.stats()["active"] == 0
+
+def test_zero_deadline_is_rejected_before_the_view_runs():
+    ran = []
+    limiter = RouteLimiter("test", max_concurrency=4, max_queue=4)
+    client = make_client(limiter, view=lambda: ran.append(1))
+
+    res = client.post("/work", headers={"X-Request-Deadline-Ms": "0"})
+    assert res.status_code == 503
+    assert "Retry-After" in res.headers
+    assert ran == []
+    assert limiter.stats()["active"] == 0
+
+def test_client_deadline_cannot_exceed_server_deadline():
+    limiter = RouteLimiter("test", max_concurrency=1, max_queue=1)
+    client = make_client(limiter)
+    assert limiter.acquire(0)
+    try:
+        # A short client deadline also bounds the time spent queued
+        start = time.monotonic()
+        res = client.post("/work", headers={"X-Request-Deadline-Ms": "100"})
+        waited = time.monotonic() - start
+    finally:
+        limiter.release()
+
+    assert res.status_code == 503
+    assert waited < 1
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            fn()
+            print(f"[OK] {name}")
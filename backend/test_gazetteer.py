@@ -0,0 +1,77 @@
+import os
+import tempfile
+
+import gazetteer
+import location_fetch
+import quota
+from gazetteer import Gazetteer
+
+ROWS = [
+    {"name": "Salem", "district": "Salem", "state": "Tamil Nadu", "pincode": "636001", "lat": "11.65", "lon": "78.16", "population": "800000"},
+    {"name": "Salempur", "district": "Deoria", "state": "Uttar Pradesh", "pincode": "", "lat": "26.3", "lon": "83.92", "population": "900000"},
+    {"name": "Mumbai", "district": "Mumbai City", "state": "Maharashtra", "pincode": "400001", "lat": "19.07", "lon": "72.88", "population": "12000000"},
+    {"name": "Mumbra", "district": "Thane", "state": "Maharashtra", "pincode": "400612", "lat": "19.17", "lon": "73.02", "population": "900000"},
+]
+
+def make_gazetteer():
+    return Gazetteer(ROWS)
+
+def test_exact_name_beats_more_populous_prefix_match():
+    # Salempur is bigger, but "Salem" names a place exactly
+    assert make_gazetteer().lookup("salem")["state"] == "Tamil Nadu"
+
+def test_prefix_match_needs_min_prefix_length():
+    gaz = make_gazetteer()
+    original = gazetteer.GAZETTEER_MIN_PREFIX
+    gazetteer.GAZETTEER_MIN_PREFIX = 4
+    try:
+        assert gaz.lookup("Mumb")["city"] == "Mumbai"  # most populous of Mumbai / Mumbra
+        assert gaz.lookup("Mum") is None
+        assert gaz.lookup("Mumb", allow_prefix=False) is None
+    finally:
+        gazetteer.GAZETTEER_MIN_PREFIX = original
+
+def test_qualifier_picks_district_or_state():
+    gaz = make_gazetteer()
+    assert gaz.lookup("Salem, Tamil Nadu")["district"] == "Salem"
+    assert gaz.lookup("Salemp, Deoria")["city"] == "Salempur"
+    assert gaz.lookup("Salem, Kerala") is None
+
+def test_unmatched_qualifier_falls_through_to_locationiq():
+    calls = []
+
+    class Response:
+        status_code = 200
+
+        def json(self):
+            return [{"lat": "10.51", "lon": "76.21", "address": {"city": "Salem", "state": "Kerala"}}]
+
+    def fake_get(url, params=None, timeout=None):
+        calls.append(params["q"])
+        return Response()
+
+    original = (location_fetch.get_gazetteer, location_fetch.requests.get, quota.QUOTA_DB_PATH)
+    location_fetch.get_gazetteer = make_gazetteer
+    location_fetch.requests.get = fake_get
+    quota.QUOTA_DB_PATH = os.path.join(tempfile.mkdtemp(), "quota.db")
+    try:
+        quota.init_quota_store()
+        assert location_fetch.resolve_location("Salem, Tamil Nadu")["state"] == "Tamil Nadu"
+        assert calls == []
+        assert location_fetch.resolve_location("Salem, Kerala")["state"] == "Kerala"
+        assert calls == ["Salem, Kerala"]
+    finally:
+        location_fetch.get_gazetteer, location_fetch.requests.get, quota.QUOTA_DB_PATH = original
+
+def test_pincode_lookup():
+    gaz = make_gazetteer()
+    assert gaz.lookup("636001")["city"] == "Salem"
+    assert gaz.lookup(" 400612 ")["city"] == "Mumbra"
+    assert gaz.lookup("999999") is None
+    assert gaz.autocomplete("400001") == [gaz.lookup("400001")]
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            fn()
+            print(f"[OK] {name}")
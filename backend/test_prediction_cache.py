@@ -0,0 +1,66 @@
+import threading
+import time
+
+from prediction_cache import PredictionCache
+
+def test_coalesces_concurrent_identical_requests():
+    cache = PredictionCache(max_entries=10, ttl=60)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.2)
+        return ("Low Risk", 20.0)
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.get_or_compute("delhi", compute)))
+        for _ in range(20)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert results == [("Low Risk", 20.0)] * 20
+    assert cache.stats()["coalesced"] == 19
+
+def test_evicts_least_recently_used():
+    cache = PredictionCache(max_entries=2, ttl=60)
+    cache.get_or_compute("a", lambda: 1)
+    cache.get_or_compute("b", lambda: 2)
+    cache.get_or_compute("a", lambda: 1)  # "a" is now most recent
+    cache.get_or_compute("c", lambda: 3)  # evicts "b"
+
+    assert cache.stats()["entries"] == 2
+    assert cache.get_or_compute("a", lambda: "recomputed") == 1
+    assert cache.get_or_compute("b", lambda: "recomputed") == "recomputed"
+
+def test_expires_after_ttl():
+    cache = PredictionCache(max_entries=10, ttl=0.05)
+    cache.get_or_compute("a", lambda: 1)
+    time.sleep(0.1)
+    assert cache.get_or_compute("a", lambda: 2) == 2
+
+def test_failed_compute_is_not_cached():
+    cache = PredictionCache(max_entries=10, ttl=60)
+
+    class Interrupted(BaseException):
+        pass
+
+    def interrupted():
+        raise Interrupted()
+
+    try:
+        cache.get_or_compute("a", interrupted)
+    except Interrupted:
+        pass
+    assert cache.stats()["entries"] == 0
+    assert cache.get_or_compute("a", lambda: 1) == 1
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            fn()
+            print(f"[OK] {name}")
@@ -0,0 +1,76 @@
+import os
+import tempfile
+
+import quota
+from quota import BACKGROUND, INTERACTIVE
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self):
+        return self.now
+
+def with_test_bucket(test):
+    """Run test against a fresh store with one provider: 1 token/second, burst 10, 30% reserve"""
+    def wrapper():
+        clock = FakeClock()
+        original = (quota.QUOTA_DB_PATH, quota.PROVIDERS, quota.BACKGROUND_RESERVE, quota.time)
+        quota.QUOTA_DB_PATH = os.path.join(tempfile.mkdtemp(), "quota.db")
+        quota.PROVIDERS = {"test": (86400, 10)}
+        quota.BACKGROUND_RESERVE = 0.3
+        quota.time = clock
+        try:
+            quota.init_quota_store()
+            test(clock)
+        finally:
+            quota.QUOTA_DB_PATH, quota.PROVIDERS, quota.BACKGROUND_RESERVE, quota.time = original
+    wrapper.__name__ = test.__name__
+    return wrapper
+
+def drain(priority):
+    taken = 0
+    while quota.acquire("test", priority):
+        taken += 1
+    return taken
+
+@with_test_bucket
+def test_background_stops_at_reserve_floor(clock):
+    assert drain(BACKGROUND) == 7
+    # The reserved 30% is still there for interactive requests
+    assert drain(INTERACTIVE) == 3
+
+@with_test_bucket
+def test_refill_serves_interactive_before_background(clock):
+    drain(INTERACTIVE)
+    clock.now += 2
+    assert not quota.acquire("test", BACKGROUND)  # 2 tokens, below the floor of 3
+    assert drain(INTERACTIVE) == 2
+
+    clock.now += 5
+    assert drain(BACKGROUND) == 2  # 5 tokens, 3 kept in reserve
+
+@with_test_bucket
+def test_refill_is_capped_at_burst(clock):
+    drain(INTERACTIVE)
+    clock.now += 3600
+    assert drain(INTERACTIVE) == 10
+
+@with_test_bucket
+def test_unknown_provider_is_not_limited(clock):
+    assert all(quota.acquire("other", BACKGROUND) for _ in range(100))
+
+def test_background_rate_excludes_reserve():
+    original = (quota.PROVIDERS, quota.BACKGROUND_RESERVE)
+    quota.PROVIDERS = {"test": (1000, 100)}
+    quota.BACKGROUND_RESERVE = 0.3
+    try:
+        assert abs(quota.background_rate("test") * 86400 - 700) < 1e-6
+    finally:
+        quota.PROVIDERS, quota.BACKGROUND_RESERVE = original
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            fn()
+            print(f"[OK] {name}")
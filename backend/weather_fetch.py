@@ -2,14 +2,36 @@ import requests
 import traceback
 import os
 from datetime import datetime, timedelta, timezone
+from admission import upstream_timeout, deadline_expired
+from quota import acquire, remember, recall, INTERACTIVE, WEATHER_STALE_MAX_AGE
 
 OPENWEATHER_API_KEY = os.getenv("OPENWEATHER_API_KEY")
 
+# Observations younger than this are served without calling OpenWeather and
+# count as fresh ("stale" stays false), whether they came from an earlier
+# request or from prefetch.py keeping popular places warm
+WEATHER_FRESH_MAX_AGE = int(os.getenv("WEATHER_FRESH_MAX_AGE", 600))
+
 
 # --------------------------------------------------
 # 🔹 CURRENT WEATHER (OPENWEATHER)
 # --------------------------------------------------
-def get_current_weather(lat, lon):
+def get_current_weather(lat, lon, priority=INTERACTIVE, max_age=WEATHER_FRESH_MAX_AGE):
+    cache_key = f"openweather:current:{float(lat):.2f},{float(lon):.2f}"
+    if max_age > 0:
+        fresh = recall(cache_key, max_age)
+        if fresh:
+            return fresh
+
+    if deadline_expired():
+        return None
+    if not acquire("openweather", priority):
+        # Budget spent: degrade to the last observation for this spot
+        stale = recall(cache_key, WEATHER_STALE_MAX_AGE)
+        if stale:
+            stale["stale"] = True
+        return stale
+
     try:
         url = "https://api.openweathermap.org/data/2.5/weather"
         params = {
@@ -19,7 +41,7 @@ def get_current_weather(lat, lon):
             "units": "metric"
         }
 
-        res = requests.get(url, params=params, timeout=10)
+        res = requests.get(url, params=params, timeout=upstream_timeout(10))
         if res.status_code != 200:
             return None
 
@@ -27,13 +49,15 @@ def get_current_weather(lat, lon):
         if data.get("cod") != 200:
             return None
 
-        return {
+        weather = {
             "temperature": data["main"]["temp"],
             "humidity": data["main"]["humidity"],
             "pressure": data["main"]["pressure"],
             "wind_speed": data["wind"]["speed"],
             "rainfall": data.get("rain", {}).get("1h", 0)
         }
+        remember(cache_key, weather)
+        return weather
 
     except Exception:
         traceback.print_exc()
@@ -43,12 +67,13 @@ def get_current_weather(lat, lon):
 # --------------------------------------------------
 # 🔹 FULL DAY WEATHER (AUTO FALLBACK)
 # --------------------------------------------------
-def get_weather_trends(lat, lon, date_str=None):
+def get_weather_trends(lat, lon, date_str=None, priority=INTERACTIVE):
     """
     REAL hourly weather
     Priority:
     1️⃣ Open-Meteo
     2️⃣ OpenWeather (only missing hours)
+    3️⃣ Archived response when both quotas are spent
     ❌ No fake data
     """
 
@@ -59,8 +84,11 @@ def get_weather_trends(lat, lon, date_str=None):
         target_date = datetime.strptime(date_str, "%Y-%m-%d").date()
         now_utc = datetime.utcnow().replace(tzinfo=timezone.utc)
 
+        cache_key = f"trends:{float(lat):.2f},{float(lon):.2f}:{date_str}"
+
         # Hour map → { "00:00": {...}, ... }
         hourly_map = {}
+        fetched = False
 
         # --------------------------------------------------
         # 🔹 1. OPEN-METEO (PRIMARY)
@@ -82,8 +110,11 @@ def get_weather_trends(lat, lon, date_str=None):
                 "timezone": "UTC"
             }
 
-            res = requests.get(url, params=params, timeout=10)
-            if res.status_code == 200:
+            res = None
+            if not deadline_expired() and acquire("open-meteo", priority):
+                res = requests.get(url, params=params, timeout=upstream_timeout(10))
+                fetched = True
+            if res is not None and res.status_code == 200:
                 data = res.json()
                 h = data.get("hourly", {})
 
@@ -119,8 +150,11 @@ def get_weather_trends(lat, lon, date_str=None):
                 "units": "metric"
             }
 
-            res = requests.get(url, params=params, timeout=10)
-            if res.status_code == 200:
+            res = None
+            if len(hourly_map) < 24 and not deadline_expired() and acquire("openweather", priority):
+                res = requests.get(url, params=params, timeout=upstream_timeout(10))
+                fetched = True
+            if res is not None and res.status_code == 200:
                 forecast = res.json()
 
                 for h in forecast.get("hourly", []):
@@ -153,13 +187,24 @@ def get_weather_trends(lat, lon, date_str=None):
             for h in sorted(hourly_map.keys())
         ]
 
-        return {
+        trends = {
             "date": date_str,
             "hourly": hourly_weather,
             "data_points": len(hourly_weather),
             "complete": len(hourly_weather) == 24
         }
 
+        if hourly_weather:
+            remember(cache_key, trends)
+        elif not fetched:
+            # Both budgets spent: serve the archived day if we have one
+            archived = recall(cache_key, WEATHER_STALE_MAX_AGE)
+            if archived:
+                archived["stale"] = True
+                return archived
+
+        return trends
+
     except Exception as e:
         print("[ERROR] Weather trends error:", e)
         traceback.print_exc()